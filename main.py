@@ -6,17 +6,125 @@ B站评论自动回复机器人
 """
 
 import os
+import re
+import gzip
+import zlib
+import math
 import time
 import json
+import atexit
+import queue
+import asyncio
 import logging
-import requests
+import aiohttp
+import httpx
 import toml
+import tomllib
+import orjson
+import ijson
+import msgspec
+import pybreaker
 import random
 import hashlib
 import urllib.parse
-from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from collections import OrderedDict
+from cachetools import TTLCache
+from pybloom_live import ScalableBloomFilter
+
+
+# 预编译refresh_csrf提取模式：以字面量refresh_csrf开头，
+# 正则引擎可快速跳扫HTML，一次线性扫描覆盖JSON/JS赋值等写法
+_REFRESH_CSRF_RE = re.compile(
+    r"refresh_csrf['\"]?\s*[:=]\s*['\"]?([0-9a-zA-Z_-]+)", re.IGNORECASE)
+
+# Cookie字符串解析：一次C层正则扫描取出所有键值对，
+# 无'='的项按空值处理，键值两侧空白由模式本身吃掉
+_COOKIE_RE = re.compile(r"\s*([^=;\s]+)\s*=?\s*([^;]*?)\s*(?:;|$)")
+
+# BV号↔aid是固定双射（2022版base58字符表+位交换+XOR掩码），
+# 可纯本地换算，无需请求x/web-interface/view
+# 小响应端点直接要原文：几百字节的JSON压缩收益抵不过解压CPU
+_IDENTITY_HEADERS = {'Accept-Encoding': 'identity'}
+
+# passport鉴权接口要求固定的Origin/Referer；共享会话的请求头池
+# 按视频页轮换且不带Origin，Cookie管理器逐请求覆盖这两项
+_PASSPORT_HEADERS = {
+    'Origin': 'https://www.bilibili.com',
+    'Referer': 'https://www.bilibili.com/',
+}
+
+# 预编码表单体直接作为content发送时使用
+_FORM_HEADERS = {
+    'Accept-Encoding': 'identity',
+    'Content-Type': 'application/x-www-form-urlencoded',
+}
+
+# 常见灌水评论，命中时不值得花一次LLM调用
+_TRIVIAL_COMMENTS = {'666', '牛', '赞', '顶', '好', '来了', '打卡', '沙发', '前排', '哈哈哈'}
+
+
+def _is_trivial_comment(comment: str) -> bool:
+    """判断评论是否为无实际内容的灌水（过短/套话/纯符号表情）"""
+    c = comment.strip()
+    return (len(c) < 3
+            or c in _TRIVIAL_COMMENTS
+            or not any(ch.isalnum() for ch in c))
+
+
+# 评论接口响应的固定结构：用msgspec按schema定制解码，
+# 只物化下面声明的字段，楼层/点赞数/子回复等未读字段在C层直接跳过
+class _ReplyContent(msgspec.Struct):
+    message: str = ''
+
+
+class _ReplyMember(msgspec.Struct):
+    uname: str = ''
+    mid: int = 0
+
+
+class _Reply(msgspec.Struct):
+    rpid: int = 0
+    ctime: int = 0
+    content: Optional[_ReplyContent] = None
+    member: Optional[_ReplyMember] = None
+
+
+class _ReplyPage(msgspec.Struct):
+    count: int = 0
+    size: int = 0
+
+
+class _ReplyData(msgspec.Struct):
+    replies: Optional[List[_Reply]] = None
+    page: Optional[_ReplyPage] = None
+
+
+class _ReplyResp(msgspec.Struct):
+    code: int = -1
+    message: str = ''
+    data: Optional[_ReplyData] = None
+
+
+_REPLY_DECODER = msgspec.json.Decoder(_ReplyResp)
+
+_BV_ALPHABET = 'FcwAPNKTMug3GV5Lj7EJnHpWsx4tb8haYeviqBz6rkCy12mUSDQX9RdoZf'
+_BV_INDEX = {c: i for i, c in enumerate(_BV_ALPHABET)}
+_BV_XOR = 23442827791579
+_BV_MASK = (1 << 51) - 1
+
+
+def bv2av(bvid: str) -> int:
+    """BV号→aid的本地换算，输入须为12位BV号"""
+    chars = list(bvid)
+    chars[3], chars[9] = chars[9], chars[3]
+    chars[4], chars[7] = chars[7], chars[4]
+    value = 0
+    for c in chars[3:]:
+        value = value * 58 + _BV_INDEX[c]
+    return (value & _BV_MASK) ^ _BV_XOR
 
 
 class BilibiliCookieManager:
@@ -25,51 +133,63 @@ class BilibiliCookieManager:
     实现Cookie的自动刷新功能
     """
 
-    def __init__(self, cookie_str: str = None, refresh_token: str = None):
+    def __init__(self, cookie_str: str = None, refresh_token: str = None,
+                 session: httpx.Client = None):
         """
         初始化Cookie管理器
 
         Args:
             cookie_str: Cookie字符串，格式为"SESSDATA=xxx; bili_jct=xxx; ..."
             refresh_token: 刷新令牌，可从登录响应中获取
+            session: 共享的httpx.Client；不传则创建独立会话
         """
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Referer': 'https://www.bilibili.com/',
-            'Origin': 'https://www.bilibili.com',
-        })
+        # 复用机器人的logger，日志同样经过QueueHandler异步写出
+        self.logger = logging.getLogger('BiliCommentBot')
+
+        if session is not None:
+            # 与调用方共享会话：同一个连接池和Cookie jar，请求头由会话持有方管理
+            self.session = session
+        else:
+            # HTTP/2多路复用+keep-alive，避免每次请求重新TLS握手
+            self.session = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=8, max_connections=32),
+                timeout=10.0,
+                headers={
+                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                    'Referer': 'https://www.bilibili.com/',
+                    'Origin': 'https://www.bilibili.com',
+                }
+            )
 
         if cookie_str:
             self.set_cookie_from_str(cookie_str)
 
         self.refresh_token = refresh_token
-        self.csrf_token = self._get_csrf_from_cookie()
+        # CSRF token（bili_jct）缓存，仅在Cookie变更时重新从jar中读取
+        self.csrf_token = self.session.cookies.get('bili_jct', None)
+        # Cookie字符串缓存，与csrf_token同步失效
+        self._cookie_str_cache = None
+        # correspondPath按秒缓存（MD5输入只依赖整秒时间戳）
+        self._correspond_path = None
+        self._correspond_path_ts = 0
 
     def set_cookie_from_str(self, cookie_str: str):
         """从字符串设置Cookie"""
-        cookie_dict = {}
-        for item in cookie_str.split(';'):
-            item = item.strip()
-            if not item:
-                continue
-            if '=' in item:
-                key, value = item.split('=', 1)
-                cookie_dict[key.strip()] = value.strip()
-            else:
-                cookie_dict[item] = ''
-        self.session.cookies.update(cookie_dict)
-
-    def _get_csrf_from_cookie(self) -> Optional[str]:
-        """从Cookie中获取CSRF Token (bili_jct)"""
-        return self.session.cookies.get('bili_jct', None)
+        self.session.cookies.update(
+            dict(m.groups() for m in _COOKIE_RE.finditer(cookie_str)))
+        self.csrf_token = self.session.cookies.get('bili_jct', None)
+        self._cookie_str_cache = None
 
     def _generate_correspond_path(self) -> str:
-        """生成加密的correspondPath参数"""
+        """生成加密的correspondPath参数（同一秒内复用MD5结果）"""
         timestamp = int(time.time())
-        md5 = hashlib.md5(f'{timestamp}'.encode()).hexdigest()
-        correspond_path = f'/apis/redirect/login?from=bilibili.com&timestamp={timestamp}&md5={md5}'
-        return correspond_path
+        if timestamp != self._correspond_path_ts:
+            md5 = hashlib.md5(f'{timestamp}'.encode()).hexdigest()
+            self._correspond_path = (
+                f'/apis/redirect/login?from=bilibili.com&timestamp={timestamp}&md5={md5}')
+            self._correspond_path_ts = timestamp
+        return self._correspond_path
 
     def check_cookie_status(self) -> Dict:
         """
@@ -81,7 +201,7 @@ class BilibiliCookieManager:
         url = 'https://passport.bilibili.com/x/passport-login/web/cookie/info'
 
         try:
-            response = self.session.get(url)
+            response = self.session.get(url, headers=_PASSPORT_HEADERS)
             response.raise_for_status()
             data = response.json()
 
@@ -118,7 +238,7 @@ class BilibiliCookieManager:
         url = f'https://www.bilibili.com/correspond/1/{encoded_path}'
 
         try:
-            response = self.session.get(url)
+            response = self.session.get(url, headers=_PASSPORT_HEADERS)
             response.raise_for_status()
 
             # 从返回的HTML中提取refresh_csrf
@@ -126,32 +246,18 @@ class BilibiliCookieManager:
             html_content = response.text
 
             # 尝试从HTML中提取refresh_csrf
-            # 尝试多种模式匹配
-            import re
-
-            # 模式1: 匹配 "refresh_csrf":"value"
-            patterns = [
-                r'"refresh_csrf"\s*:\s*"([^"]+)"',
-                r'"refresh_csrf"\s*:\s*"((?:[^"\\]|\\.)*)"',  # 处理转义字符
-                r"refresh_csrf\s*=\s*'([^']+)'",
-                r"refresh_csrf\s*=\s*\"([^\"]+)\"",
-                r'"refresh_csrf"\s*:\s*([0-9a-f]+)',  # 匹配数字/字母组合（如MD5）
-                r"refresh_csrf['\"]?\s*[:=]\s*['\"]?([0-9a-zA-Z_-]+)['\"]?"  # 更宽松的匹配
-            ]
-
-            for pattern in patterns:
-                match = re.search(pattern, html_content, re.IGNORECASE)
-                if match:
-                    csrf_value = match.group(1)
-                    # 验证值不为空且不是纯数字
-                    if csrf_value and csrf_value.strip():
-                        return csrf_value.strip()
+            match = _REFRESH_CSRF_RE.search(html_content)
+            if match:
+                csrf_value = match.group(1)
+                # 验证值不为空且不是纯数字
+                if csrf_value and csrf_value.strip():
+                    return csrf_value.strip()
 
             # 如果都失败，打印部分HTML用于调试
             # 找到包含refresh_csrf的行
             lines_with_keyword = [line for line in html_content.split('\n') if 'refresh_csrf' in line.lower()]
             if lines_with_keyword:
-                self.logger.debug(f"找到包含refresh_csrf的行: {lines_with_keyword[:3]}")
+                self.logger.debug("找到包含refresh_csrf的行: %s", lines_with_keyword[:3])
 
             return None
 
@@ -179,7 +285,7 @@ class BilibiliCookieManager:
             return False, {'message': '获取refresh_csrf失败'}
 
         # 获取CSRF token
-        csrf_token = self._get_csrf_from_cookie()
+        csrf_token = self.csrf_token
         if not csrf_token:
             return False, {'message': '从Cookie中获取CSRF token失败'}
 
@@ -194,7 +300,7 @@ class BilibiliCookieManager:
         }
 
         try:
-            response = self.session.post(url, data=params)
+            response = self.session.post(url, data=params, headers=_PASSPORT_HEADERS)
             response.raise_for_status()
             data = response.json()
 
@@ -214,11 +320,14 @@ class BilibiliCookieManager:
                         # 将响应中的新 Cookie 更新到 session
                         for cookie_name, cookie_value in response.cookies.items():
                             self.session.cookies.set(cookie_name, cookie_value)
-                            self.logger.debug(f"更新Cookie: {cookie_name}")
-
-                    # 验证关键 Cookie 是否存在
-                    sessdata = self.session.cookies.get('SESSDATA')
-                    bili_jct = self.session.cookies.get('bili_jct')
+                            self.logger.debug("更新Cookie: %s", cookie_name)
+
+                    # 一次快照后从dict读取，避免重复遍历cookie jar
+                    jar = dict(self.session.cookies)
+                    sessdata = jar.get('SESSDATA')
+                    bili_jct = jar.get('bili_jct')
+                    self.csrf_token = bili_jct
+                    self._cookie_str_cache = None
                     if not sessdata or not bili_jct:
                         self.logger.warning(f"刷新后关键 Cookie 缺失: SESSDATA={bool(sessdata)}, bili_jct={bool(bili_jct)}")
                     else:
@@ -228,7 +337,7 @@ class BilibiliCookieManager:
                         'message': 'Cookie刷新成功',
                         'data': response_data,
                         'new_refresh_token': new_refresh_token,
-                        'cookies': dict(self.session.cookies)
+                        'cookies': jar
                     }
                 else:
                     return False, {'message': 'Cookie刷新确认失败'}
@@ -254,7 +363,7 @@ class BilibiliCookieManager:
         Returns:
             bool: 是否成功
         """
-        csrf_token = self._get_csrf_from_cookie()
+        csrf_token = self.csrf_token
         if not csrf_token:
             return False
 
@@ -266,7 +375,7 @@ class BilibiliCookieManager:
         }
 
         try:
-            response = self.session.post(url, data=params)
+            response = self.session.post(url, data=params, headers=_PASSPORT_HEADERS)
             response.raise_for_status()
             data = response.json()
 
@@ -276,8 +385,12 @@ class BilibiliCookieManager:
             return False
 
     def get_cookie_str(self) -> str:
-        """获取当前Cookie字符串"""
-        return '; '.join([f'{k}={v}' for k, v in self.session.cookies.items()])
+        """获取当前Cookie字符串（结果缓存，Cookie变更时重建）"""
+        if self._cookie_str_cache is None:
+            self._cookie_str_cache = '; '.join(
+                f'{k}={v}' for k, v in self.session.cookies.items()
+            )
+        return self._cookie_str_cache
 
     def save_to_file(self, filename: str = 'bilibili_cookie.json'):
         """保存Cookie和refresh_token到文件"""
@@ -288,7 +401,7 @@ class BilibiliCookieManager:
         }
 
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+            json.dump(data, f, ensure_ascii=False)
 
     def load_from_file(self, filename: str = 'bilibili_cookie.json') -> bool:
         """从文件加载Cookie和refresh_token"""
@@ -303,7 +416,8 @@ class BilibiliCookieManager:
             if 'refresh_token' in data:
                 self.refresh_token = data['refresh_token']
 
-            self.csrf_token = self._get_csrf_from_cookie()
+            self.csrf_token = self.session.cookies.get('bili_jct', None)
+            self._cookie_str_cache = None
             return True
 
         except Exception as e:
@@ -316,17 +430,16 @@ class BilibiliCookieManager:
         Returns:
             Tuple[bool, Dict]: (是否有效, 状态信息)
         """
-        # 检查关键Cookie是否存在
-        sessdata = self.session.cookies.get('SESSDATA')
-        bili_jct = self.session.cookies.get('bili_jct')
-        if not sessdata or not bili_jct:
+        # 检查关键Cookie是否存在（一次快照，两个键都从dict取）
+        jar = dict(self.session.cookies)
+        if not jar.get('SESSDATA') or not jar.get('bili_jct'):
             return False, {'message': '关键Cookie缺失 (SESSDATA或bili_jct)'}
 
         # 调用B站API验证登录状态
         url = 'https://api.bilibili.com/x/space/myinfo'
 
         try:
-            response = self.session.get(url)
+            response = self.session.get(url, headers=_PASSPORT_HEADERS)
             response.raise_for_status()
             data = response.json()
 
@@ -366,15 +479,44 @@ class BilibiliCookieManager:
                 return False, {'message': 'Cookie状态正常，无需刷新'}
 
 
-@dataclass
+@dataclass(slots=True)
+class CachedResponse:
+    """缓存命中时返回的轻量响应对象
+
+    直接持有已解析的dict，json()零开销返回；
+    text只在真正访问时才序列化。
+    """
+    _json: dict
+    status_code: int = 200
+    headers: dict = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        return json.dumps(self._json, ensure_ascii=False) if self._json else ""
+
+    def json(self) -> dict:
+        if not self._json:
+            raise json.JSONDecodeError("Empty content", "", 0)
+        return self._json
+
+
+@dataclass(slots=True, frozen=True)
 class Comment:
-    """评论数据类"""
-    comment_id: str
+    """评论数据类
+
+    comment_id/uid保持API返回的int原样，仅在写历史记录等
+    边界处转为str，避免每条评论的冗余字符串分配。
+    slots+frozen压缩单实例内存并支持按comment_id哈希去重；
+    回复状态由processed_comments统一跟踪。
+    """
+    comment_id: int
     content: str
     user: str
-    uid: str
+    uid: int
     time: int
-    replied: bool = False
+
+    def __hash__(self) -> int:
+        return hash(self.comment_id)
 
 
 class BiliCommentBot:
@@ -384,7 +526,13 @@ class BiliCommentBot:
         """初始化机器人"""
         self.config = self.load_config(config_path)
         self.setup_logging()
-        self.session = requests.Session()
+        # HTTP/2多路复用：多个在途请求共享同一条TCP/TLS连接；
+        # 重试仍由make_request_with_retry在应用层处理
+        self.session = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=8, max_connections=32),
+            timeout=10.0
+        )
 
         # 初始化请求头池
         self.user_agents = [
@@ -402,6 +550,24 @@ class BiliCommentBot:
             'https://space.bilibili.com/'
         ]
 
+        # 预构建UA×Referer的完整请求头池，轮换时只换引用不重建字典
+        base_headers = {
+            'Accept': 'application/json, text/plain, */*',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+            # 显式协商zstd优先：解压CPU约为brotli的1/2~1/3，
+            # 解码由httpx调用zstandard/brotli的C实现完成
+            'Accept-Encoding': 'zstd, br, gzip',
+            'Connection': 'keep-alive',
+            'Sec-Fetch-Dest': 'empty',
+            'Sec-Fetch-Mode': 'cors',
+            'Sec-Fetch-Site': 'same-site'
+        }
+        self._header_pool = [
+            dict(base_headers, **{'User-Agent': ua, 'Referer': ref})
+            for ua in self.user_agents
+            for ref in self.referers
+        ]
+
         self.update_headers()
 
         # 初始化Cookie管理器
@@ -411,21 +577,20 @@ class BiliCommentBot:
         self.auto_refresh_cookie = self.config['bilibili'].get('auto_refresh_cookie', True)
 
         if self.config['bilibili']['cookie']:
+            # Cookie管理器共享机器人的session，复用同一连接池和Cookie jar
             # 尝试从文件加载Cookie
-            self.cookie_manager = BilibiliCookieManager()
+            self.cookie_manager = BilibiliCookieManager(session=self.session)
             if self.cookie_manager.load_from_file('bilibili_cookie.json'):
                 self.logger.info("从文件加载Cookie成功")
-                # 合并session
-                self.session.cookies.update(self.cookie_manager.session.cookies)
             else:
                 # 从配置文件加载Cookie
                 cookie_str = self.config['bilibili']['cookie']
                 refresh_token = self.config['bilibili'].get('refresh_token', '')
-                self.cookie_manager = BilibiliCookieManager(cookie_str, refresh_token)
-                self.session.cookies.update(self.cookie_manager.session.cookies)
+                self.cookie_manager = BilibiliCookieManager(cookie_str, refresh_token,
+                                                            session=self.session)
 
             # 提取CSRF token
-            self.csrf_token = self.cookie_manager._get_csrf_from_cookie()
+            self.csrf_token = self.cookie_manager.csrf_token
 
             # 如果启用了自动刷新，启动时检查一次
             if self.auto_refresh_cookie and self.cookie_manager.refresh_token:
@@ -434,8 +599,16 @@ class BiliCommentBot:
         else:
             self.csrf_token = None
 
-        self.processed_comments = set()
-        self.history_file = "history.json"
+        # 已处理评论：LRU限容字典 + 布隆过滤器做快速未命中判断
+        self.processed_comments = OrderedDict()
+        self.processed_comments_cap = 50000
+        # 可扩容布隆过滤器：满时自动追加新层，add不会因容量上限抛异常
+        self.seen_bloom = ScalableBloomFilter(
+            initial_capacity=1_000_000, error_rate=0.001)
+        self.history_file = "history.jsonl"
+        self.history_ids_file = "history.ids"  # 只存comment_id的旁路文件，加速冷启动
+        self._history_fh = None  # 追加写句柄，首次写入时打开
+        self._history_ids_fh = None
         self.load_history()
 
         # 请求频率控制
@@ -445,13 +618,49 @@ class BiliCommentBot:
         self.max_retries = rate_limit_config.get('max_retries', 3)
         self.retry_delay = rate_limit_config.get('retry_delay', 5)
 
-        # 缓存配置
-        self.cache = {}
+        # 缓存配置（限容+TTL自动过期，防止无界增长）
         self.cache_expire_time = 300  # 5分钟缓存过期时间
+        self.cache = TTLCache(maxsize=2048, ttl=self.cache_expire_time)
 
-        # 动态间隔控制
-        self.consecutive_failures = 0
-        self.adaptive_interval = self.min_request_interval
+        # DeepSeek专用客户端：HTTP/2多路复用单连接，省去每次调用的TLS握手
+        api_config = self.config['deepseek']
+        self._deepseek_url = f"{api_config['base_url']}/chat/completions"
+        self._deepseek_system_prompt = api_config.get('system_prompt',
+            '你是一个友善的B站游戏区Minecraft UP主，请对评论做出自然、友好的回复。回复要简洁明了，控制在100字以内。')
+        self._deepseek_headers = {
+            'Authorization': f"Bearer {api_config['api_key']}",
+            'Content-Type': 'application/json'
+        }
+        # 请求体中不随评论变化的部分只构造一次
+        self._deepseek_payload_base = {
+            'model': api_config['model'],
+            'max_tokens': api_config['max_tokens'],
+            'temperature': api_config['temperature']
+        }
+        self._deepseek_client = httpx.Client(
+            http2=True,
+            timeout=30,
+            headers=self._deepseek_headers
+        )
+        # 相同评论内容（常见于刷屏）1小时内复用已生成的回复
+        self._reply_cache = TTLCache(maxsize=256, ttl=3600)
+
+        # csrf的URL编码结果缓存，Cookie刷新后按需重编码
+        self._csrf_quoted = ''
+        self._csrf_quoted_src = None
+
+        # 按端点熔断：连续失败后直接短路，避免在故障期反复等30秒超时
+        self._bili_breaker = pybreaker.CircuitBreaker(fail_max=5, reset_timeout=300)
+        self._llm_breaker = pybreaker.CircuitBreaker(fail_max=3, reset_timeout=120)
+
+        # 令牌桶限流（允许短时突发，AIMD自适应调整速率）
+        self.bucket_capacity = 5.0
+        self.bucket_rate_ceiling = (1.0 / self.min_request_interval) if self.min_request_interval > 0 else 5.0
+        self.bucket_rate = self.bucket_rate_ceiling  # 当前令牌补充速率（个/秒）
+        self.bucket_rate_floor = 0.1
+        self.tokens = self.bucket_capacity
+        self.last_refill_time = time.time()
+        self.success_streak = 0
 
         # 视频列表缓存配置（12小时）
         video_cache_config = self.config.get('video_cache', {})
@@ -461,32 +670,116 @@ class BiliCommentBot:
         self.video_cache_expire_time = video_cache_config.get('expire_time', 43200)  # 默认12小时
         self.load_video_cache()
 
+        # bvid→aid转换缓存（转换关系固定不变，可跨进程持久化）
+        self.bvid_aid_cache_file = 'bvid_aid_cache.json'
+        self.bvid_aid_cache = {}
+        self.load_bvid_aid_cache()
+
         self.logger.info("B站评论自动回复机器人启动")
     
     def extract_csrf_token(self, cookie: str) -> Optional[str]:
         """从Cookie中提取CSRF token (bili_jct)"""
-        import re
-        match = re.search(r'bili_jct=([^;]+)', cookie)
-        if match:
-            return match.group(1)
-        else:
-            self.logger.warning("未在Cookie中找到bili_jct (CSRF token)")
-            return None
+        token = cookie.partition('bili_jct=')[2].partition(';')[0].strip()
+        if token:
+            return token
+        self.logger.warning("未在Cookie中找到bili_jct (CSRF token)")
+        return None
     
+    def _migrate_legacy_history(self):
+        """将旧的history.json列表格式迁移为按行追加的history.jsonl"""
+        legacy_file = "history.json"
+        if os.path.exists(self.history_file) or not os.path.exists(legacy_file):
+            return
+
+        try:
+            count = 0
+            with open(legacy_file, 'rb') as src, \
+                    open(self.history_file, 'wb') as dst:
+                # 流式解析旧文件，峰值内存与文件大小无关
+                for item in ijson.items(src, 'item'):
+                    dst.write(orjson.dumps(item) + b'\n')
+                    count += 1
+
+            self.logger.info(f"历史记录已迁移为JSONL格式，共 {count} 条")
+        except Exception as e:
+            self.logger.error(f"迁移历史记录失败: {e}")
+
     def load_history(self):
-        """加载历史记录"""
+        """加载历史记录（逐行流式读取）"""
         try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    history = json.load(f)
-                    # 从历史记录中恢复已处理的评论ID
-                    self.processed_comments = set(item.get('comment_id') for item in history)
-                    self.logger.info(f"加载历史记录，已处理 {len(self.processed_comments)} 条评论")
+            self._migrate_legacy_history()
+
+            count = 0
+            if os.path.exists(self.history_ids_file):
+                # 快路径：旁路文件每行一个comment_id，无需解析JSON
+                with open(self.history_ids_file, 'r', encoding='utf-8') as f:
+                    for token in f.read().split():
+                        # 以int存储：比等长str省约3倍内存，哈希也更快
+                        comment_id = int(token)
+                        self.seen_bloom.add(comment_id)
+                        self.processed_comments[comment_id] = True
+                        count += 1
+            elif os.path.exists(self.history_file):
+                # 无旁路文件时扫描完整历史，并顺手重建旁路文件
+                with open(self.history_file, 'rb') as src, \
+                        open(self.history_ids_file, 'w', encoding='utf-8') as ids:
+                    for line in src:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        comment_id = orjson.loads(line).get('comment_id')
+                        if comment_id:
+                            comment_id = int(comment_id)
+                            # 所有评论ID进布隆过滤器，LRU字典只保留最近的若干条
+                            self.seen_bloom.add(comment_id)
+                            self.processed_comments[comment_id] = True
+                            ids.write(f"{comment_id}\n")
+                            count += 1
             else:
                 self.logger.info("未找到历史记录文件，将创建新的历史记录")
+                return
+
+            while len(self.processed_comments) > self.processed_comments_cap:
+                self.processed_comments.popitem(last=False)
+
+            self.logger.info(f"加载历史记录，已处理 {count} 条评论")
         except Exception as e:
             self.logger.error(f"加载历史记录失败: {e}")
-            self.processed_comments = set()
+            self.processed_comments = OrderedDict()
+
+    def is_comment_processed(self, comment_id) -> bool:
+        """判断评论是否已处理过"""
+        # 历史记录与布隆过滤器统一用int键（PyLong比PyUnicode小得多）
+        comment_id = int(comment_id)
+
+        # 布隆过滤器无假阴性，未命中说明一定没处理过
+        if comment_id not in self.seen_bloom:
+            return False
+
+        if comment_id in self.processed_comments:
+            self.processed_comments.move_to_end(comment_id)
+            return True
+
+        # LRU已淘汰但布隆过滤器命中（可能是误判），回退到历史文件确认
+        try:
+            if os.path.exists(self.history_file):
+                with open(self.history_file, 'rb') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line and int(orjson.loads(line).get('comment_id', 0)) == comment_id:
+                            return True
+        except Exception as e:
+            self.logger.error(f"读取历史记录失败: {e}")
+        return False
+
+    def mark_comment_processed(self, comment_id):
+        """记录已处理的评论ID，超出容量时淘汰最旧的"""
+        comment_id = int(comment_id)
+        self.processed_comments[comment_id] = True
+        if comment_id not in self.seen_bloom:
+            self.seen_bloom.add(comment_id)
+        while len(self.processed_comments) > self.processed_comments_cap:
+            self.processed_comments.popitem(last=False)
     
     def save_history(self, comment: Comment, reply_content: str):
         """保存回复历史"""
@@ -499,38 +792,39 @@ class BiliCommentBot:
                 'time': comment.time,
                 'reply_time': int(time.time()),
                 'reply_content': reply_content,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
             }
             
-            # 读取现有历史记录
-            history = []
-            if os.path.exists(self.history_file):
-                try:
-                    with open(self.history_file, 'r', encoding='utf-8') as f:
-                        history = json.load(f)
-                except:
-                    history = []
-            
-            # 添加新记录
-            history.append(history_item)
-            
-            # 保存到文件
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, ensure_ascii=False, indent=2)
-            
+            # 追加写入，避免每次回复都重写整个历史文件；
+            # 句柄常驻，省去每次回复的open/close
+            if self._history_fh is None:
+                self._history_fh = open(self.history_file, 'ab')
+            self._history_fh.write(orjson.dumps(history_item) + b'\n')
+            self._history_fh.flush()
+
+            # 同步追加到旁路ID文件，供下次冷启动快速加载
+            if self._history_ids_fh is None:
+                self._history_ids_fh = open(self.history_ids_file, 'a', encoding='utf-8')
+            self._history_ids_fh.write(f"{comment.comment_id}\n")
+            self._history_ids_fh.flush()
+
             self.logger.info(f"保存回复历史: {comment.comment_id}")
         except Exception as e:
             self.logger.error(f"保存历史记录失败: {e}")
     
     def load_video_cache(self):
         """加载视频列表缓存"""
+        self.video_list_etag = None
+        self.video_list_last_modified = None
         try:
             if os.path.exists(self.video_cache_file):
-                with open(self.video_cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
+                with open(self.video_cache_file, 'rb') as f:
+                    cache_data = orjson.loads(f.read())
                     self.cached_videos = cache_data.get('videos', [])
                     self.last_video_fetch_time = cache_data.get('fetch_time', 0)
-                    
+                    self.video_list_etag = cache_data.get('etag')
+                    self.video_list_last_modified = cache_data.get('last_modified')
+
                     cache_age = (time.time() - self.last_video_fetch_time) / 3600  # 转换为小时
                     self.logger.info(f"加载视频缓存，缓存{cache_age:.1f}小时，共{len(self.cached_videos)}个视频")
             else:
@@ -539,117 +833,132 @@ class BiliCommentBot:
             self.logger.error(f"加载视频缓存失败: {e}")
             self.cached_videos = []
             self.last_video_fetch_time = 0
-    
+
     def save_video_cache(self, videos: List[Dict]):
         """保存视频列表缓存"""
         try:
             cache_data = {
                 'videos': videos,
                 'fetch_time': int(time.time()),
-                'fetch_timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'fetch_timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                # 条件revalidation所需的验证器
+                'etag': self.video_list_etag,
+                'last_modified': self.video_list_last_modified
             }
             
-            with open(self.video_cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            with open(self.video_cache_file, 'wb') as f:
+                f.write(orjson.dumps(cache_data))
             
             self.logger.info(f"保存视频缓存，共{len(videos)}个视频")
         except Exception as e:
             self.logger.error(f"保存视频缓存失败: {e}")
     
+    def load_bvid_aid_cache(self):
+        """加载bvid→aid转换缓存"""
+        try:
+            if os.path.exists(self.bvid_aid_cache_file):
+                with open(self.bvid_aid_cache_file, 'rb') as f:
+                    self.bvid_aid_cache = orjson.loads(f.read())
+                self.logger.info(f"加载bvid转换缓存，共{len(self.bvid_aid_cache)}条")
+        except Exception as e:
+            self.logger.error(f"加载bvid转换缓存失败: {e}")
+            self.bvid_aid_cache = {}
+
+    def save_bvid_aid_cache(self):
+        """保存bvid→aid转换缓存"""
+        try:
+            with open(self.bvid_aid_cache_file, 'wb') as f:
+                f.write(orjson.dumps(self.bvid_aid_cache))
+        except Exception as e:
+            self.logger.error(f"保存bvid转换缓存失败: {e}")
+
     def update_headers(self):
-        """更新请求头，随机化特征"""
-        self.session.headers.update({
-            'User-Agent': random.choice(self.user_agents),
-            'Referer': random.choice(self.referers),
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            # 不设置Accept-Encoding，让requests库自动处理解压
-            # 'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Sec-Fetch-Dest': 'empty',
-            'Sec-Fetch-Mode': 'cors',
-            'Sec-Fetch-Site': 'same-site'
-        })
-    
-    def get_cache_key(self, url: str, params: dict = None) -> str:
-        """生成缓存键"""
-        import hashlib
-        cache_data = f"{url}_{str(sorted(params.items()) if params else '')}"
-        return hashlib.md5(cache_data.encode()).hexdigest()
+        """更新请求头，随机化特征（从预构建的请求头池中选取）"""
+        self.session.headers = random.choice(self._header_pool)
     
-    def get_from_cache(self, cache_key: str) -> Optional[dict]:
+    def get_cache_key(self, url: str, params: dict = None) -> tuple:
+        """生成缓存键（url+参数元组，无需任何摘要计算）"""
+        return (url, tuple(sorted(params.items())) if params else ())
+
+    def get_from_cache(self, cache_key: tuple) -> Optional[dict]:
         """从缓存获取数据"""
-        if cache_key in self.cache:
-            data, timestamp = self.cache[cache_key]
-            if time.time() - timestamp < self.cache_expire_time:
-                self.logger.debug(f"使用缓存数据: {cache_key}")
-                return data
-            else:
-                del self.cache[cache_key]
-        return None
-    
-    def set_cache(self, cache_key: str, data: dict):
+        data = self.cache.get(cache_key)
+        if data is not None:
+            self.logger.debug("使用缓存数据: %s", cache_key)
+        return data
+
+    def set_cache(self, cache_key: tuple, data: dict):
         """设置缓存"""
-        self.cache[cache_key] = (data, time.time())
+        self.cache[cache_key] = data
     
+    def _acquire_token(self) -> float:
+        """补充并消费一个令牌，返回需等待的秒数（有余量时为0）"""
+        now = time.time()
+        self.tokens = min(
+            self.bucket_capacity,
+            self.tokens + (now - self.last_refill_time) * self.bucket_rate
+        )
+        self.last_refill_time = now
+
+        self.tokens -= 1.0
+        if self.tokens < 0:
+            return -self.tokens / self.bucket_rate
+        return 0.0
+
     def rate_limit_request(self):
-        """动态请求频率限制"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        # 根据连续失败次数调整间隔
-        if self.consecutive_failures > 0:
-            self.adaptive_interval = min(
-                self.min_request_interval * (1 + self.consecutive_failures * 0.5),
-                self.min_request_interval * 5
-            )
-        else:
-            self.adaptive_interval = self.min_request_interval
-        
-        if time_since_last_request < self.adaptive_interval:
-            sleep_time = self.adaptive_interval - time_since_last_request
-            # 添加随机抖动
-            jitter = random.uniform(0, 0.5)
-            total_sleep = sleep_time + jitter
-            self.logger.debug(f"动态频率限制，等待 {total_sleep:.2f} 秒 (间隔: {self.adaptive_interval:.2f}s)")
-            time.sleep(total_sleep)
-        
+        """令牌桶请求限流
+
+        按当前速率补充令牌，有余量时立即放行（支持突发），
+        令牌不足时按欠缺量休眠。
+        """
+        sleep_time = self._acquire_token()
+        if sleep_time > 0:
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("令牌桶限流，等待 %.2f 秒 (速率: %.2f/s)", sleep_time, self.bucket_rate)
+            time.sleep(sleep_time)
+
         self.last_request_time = time.time()
         self.update_headers()  # 每次请求前更新请求头
+
+    async def _async_rate_limit(self):
+        """异步版令牌桶限流，与同步路径共享同一个桶"""
+        sleep_time = self._acquire_token()
+        if sleep_time > 0:
+            await asyncio.sleep(sleep_time)
+
+    def _rate_limit_backoff(self):
+        """请求失败时乘性降低令牌补充速率（AIMD中的MD）"""
+        self.bucket_rate = max(self.bucket_rate_floor, self.bucket_rate * 0.7)
+        self.success_streak = 0
+        self.logger.debug("降低请求速率至 %.2f/s", self.bucket_rate)
+
+    def _rate_limit_recover(self):
+        """连续成功后加性恢复令牌补充速率（AIMD中的AI）"""
+        self.success_streak += 1
+        if self.success_streak >= 10 and self.bucket_rate < self.bucket_rate_ceiling:
+            self.bucket_rate = min(self.bucket_rate_ceiling, self.bucket_rate + 0.1)
+            self.success_streak = 0
     
-    def make_request_with_retry(self, method: str, url: str, use_cache: bool = True, **kwargs) -> Optional[requests.Response]:
+    def make_request_with_retry(self, method: str, url: str, use_cache: bool = True, **kwargs) -> Optional[httpx.Response]:
         """带重试机制的智能请求"""
         # 检查缓存（仅对GET请求）
         if use_cache and method.upper() == 'GET':
             cache_key = self.get_cache_key(url, kwargs.get('params'))
             cached_data = self.get_from_cache(cache_key)
             if cached_data:
-                # 创建模拟响应对象
-                class MockResponse:
-                    def __init__(self, data):
-                        self.status_code = 200
-                        self.headers = {}
-                        self.text = json.dumps(data) if data else ""
-                        self._json = data
-                    
-                    def json(self):
-                        if not self._json:
-                            raise json.JSONDecodeError("Empty content", "", 0)
-                        return self._json
-                
-                self.logger.debug(f"使用缓存响应: {cache_key}")
-                return MockResponse(cached_data)
+                self.logger.debug("使用缓存响应: %s", cache_key)
+                return CachedResponse(cached_data)
         
         for attempt in range(self.max_retries):
             try:
                 # 应用动态频率限制
                 self.rate_limit_request()
-                
-                response = self.session.request(method, url, **kwargs)
+
+                response = self._bili_breaker.call(self.session.request, method, url, **kwargs)
                 
                 # 检查响应状态
                 if response.status_code == 429 or "请求过于频繁" in response.text:
-                    self.consecutive_failures += 1
+                    self._rate_limit_backoff()
                     if attempt < self.max_retries - 1:
                         # 智能退避：检查Retry-After头部
                         retry_after = int(response.headers.get('Retry-After', self.retry_delay * (2 ** attempt)))
@@ -661,16 +970,18 @@ class BiliCommentBot:
                         time.sleep(wait_time)
                         continue
                 elif response.status_code >= 500:
-                    self.consecutive_failures += 1
+                    self._rate_limit_backoff()
                     if attempt < self.max_retries - 1:
                         wait_time = self.retry_delay * (2 ** attempt) + random.uniform(0, 2)
                         self.logger.warning(f"服务器错误 {response.status_code}，{wait_time:.1f}秒后重试 (尝试 {attempt + 1}/{self.max_retries})")
                         time.sleep(wait_time)
                         continue
                 else:
-                    self.consecutive_failures = 0  # 重置失败计数
+                    self._rate_limit_recover()
                 
-                # 检查响应内容是否为空
+                # 检查响应内容是否为空（304本身就是空体，直接放行）
+                if response.status_code == 304:
+                    return response
                 if not response.text:
                     self.logger.warning(f"响应内容为空，状态码: {response.status_code}")
                     if attempt < self.max_retries - 1:
@@ -685,7 +996,7 @@ class BiliCommentBot:
                     try:
                         response_text = self.decompress_response(response)
                         if response_text:
-                            data = json.loads(response_text)
+                            data = orjson.loads(response_text)
                             cache_key = self.get_cache_key(url, kwargs.get('params'))
                             self.set_cache(cache_key, data)
                     except:
@@ -693,8 +1004,11 @@ class BiliCommentBot:
                 
                 return response
                 
-            except requests.exceptions.RequestException as e:
-                self.consecutive_failures += 1
+            except pybreaker.CircuitBreakerError:
+                self.logger.error("B站接口熔断中，跳过请求")
+                return None
+            except httpx.HTTPError as e:
+                self._rate_limit_backoff()
                 if attempt < self.max_retries - 1:
                     wait_time = self.retry_delay * (2 ** attempt) + random.uniform(0, 2)
                     self.logger.warning(f"请求异常，{wait_time:.1f}秒后重试: {e} (尝试 {attempt + 1}/{self.max_retries})")
@@ -709,8 +1023,9 @@ class BiliCommentBot:
     def load_config(self, config_path: str) -> dict:
         """加载配置文件"""
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return toml.load(f)
+            # 读取用标准库tomllib，写回refresh_token时仍用toml.dump
+            with open(config_path, 'rb') as f:
+                return tomllib.load(f)
         except FileNotFoundError:
             raise FileNotFoundError(f"配置文件 {config_path} 不存在")
         except Exception as e:
@@ -720,6 +1035,11 @@ class BiliCommentBot:
         """设置日志"""
         log_config = self.config['logging']
         log_level = getattr(logging, log_config['level'].upper())
+
+        # 不采集线程/进程字段，减少每条日志记录的开销
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
         
         # 创建日志目录
         log_file = log_config['file']
@@ -735,17 +1055,25 @@ class BiliCommentBot:
         # 设置根日志器
         self.logger = logging.getLogger('BiliCommentBot')
         self.logger.setLevel(log_level)
-        
+
         # 文件处理器
         file_handler = logging.FileHandler(log_file, encoding='utf-8')
         file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
-        
+        handlers = [file_handler]
+
         # 控制台处理器
         if log_config['console']:
             console_handler = logging.StreamHandler()
             console_handler.setFormatter(formatter)
-            self.logger.addHandler(console_handler)
+            handlers.append(console_handler)
+
+        # 队列化日志：请求线程只入队，磁盘/控制台写入由后台监听线程完成
+        log_queue = queue.Queue(-1)
+        self.logger.addHandler(QueueHandler(log_queue))
+        self._log_listener = QueueListener(log_queue, *handlers,
+                                           respect_handler_level=True)
+        self._log_listener.start()
+        atexit.register(self._log_listener.stop)
     
     def get_video_list(self) -> List[Dict]:
         """获取用户的视频列表（12小时缓存）"""
@@ -774,40 +1102,54 @@ class BiliCommentBot:
             'order': 'pubdate'
         }
         
+        # 条件请求：带上次响应的验证器，内容未变化时服务端返回304空体
+        cond_headers = {}
+        if self.video_list_etag:
+            cond_headers['If-None-Match'] = self.video_list_etag
+        if self.video_list_last_modified:
+            cond_headers['If-Modified-Since'] = self.video_list_last_modified
+
         try:
-            response = self.make_request_with_retry('GET', url, params=params, use_cache=False)
+            response = self.make_request_with_retry('GET', url, params=params, use_cache=False,
+                                                    headers=cond_headers or None)
             if not response:
                 # 如果获取失败，尝试使用旧缓存
                 if self.cached_videos:
                     self.logger.warning("获取视频列表失败，使用过期缓存")
                     return self.cached_videos
                 return []
-            
-            # 解压响应内容
-            response_text = self.decompress_response(response)
-            
-            if not response_text:
-                self.logger.error("获取视频列表失败，响应内容为空")
-                if self.cached_videos:
-                    self.logger.warning("使用过期缓存")
-                    return self.cached_videos
-                return []
-            
-            # 尝试解析JSON
-            try:
-                data = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                self.logger.error(f"视频列表JSON解析失败: {e}")
-                self.logger.error(f"响应内容长度: {len(response_text)}, 前100字符: {response_text[:100]}")
+
+            if response.status_code == 304 and self.cached_videos:
+                # 内容未变化，仅续期本地TTL，不重新传输和解析
+                self.last_video_fetch_time = current_time
+                self.save_video_cache(self.cached_videos)
+                self.logger.info(f"视频列表未变化（304），续用缓存，共{len(self.cached_videos)}个视频")
+                return self.cached_videos
+
+            data = self._response_json(response)
+            if data is None:
+                self.logger.error("获取视频列表失败，响应内容为空或解析失败")
                 if self.cached_videos:
                     self.logger.warning("使用过期缓存")
                     return self.cached_videos
                 return []
-            
+
             if data.get('code') == 0:
-                videos = data['data']['list']['vlist']
+                # 只保留后续会用到的字段，丢弃vlist中的大量无关字段，
+                # 降低常驻内存和缓存文件体积
+                videos = [
+                    {
+                        'bvid': v['bvid'],
+                        'aid': v.get('aid'),
+                        'title': v.get('title', ''),
+                        'created': v.get('created'),
+                    }
+                    for v in data['data']['list']['vlist']
+                ]
                 self.cached_videos = videos
                 self.last_video_fetch_time = current_time
+                self.video_list_etag = response.headers.get('ETag')
+                self.video_list_last_modified = response.headers.get('Last-Modified')
                 self.save_video_cache(videos)
                 self.logger.info(f"成功获取视频列表，共 {len(videos)} 个视频")
                 return videos
@@ -826,191 +1168,258 @@ class BiliCommentBot:
                 return self.cached_videos
             return []
     
-    def decompress_response(self, response) -> str:
-        """解压响应内容"""
-        import gzip
-        import zlib
-        
+    def decompress_response(self, response) -> bytes:
+        """获取响应的原始字节内容
+
+        httpx已按Content-Encoding自动解码，这里只兜底处理
+        头部缺失但内容仍是gzip/deflate压缩的情况。
+        直接返回bytes交给orjson解析，不再做encode/decode往返校验。
+        """
         try:
-            # 如果response.text已经可用且不是乱码，直接返回
-            if hasattr(response, 'text') and response.text:
-                # 检查是否是有效的文本内容（不是二进制乱码）
-                try:
-                    # 尝试编码/解码来验证
-                    response.text.encode('utf-8').decode('utf-8')
-                    return response.text
-                except:
-                    pass
-            
-            # 获取原始内容
-            content = response.content if hasattr(response, 'content') else response.text
-            
+            content = response.content
+
             if not content:
-                return ""
-            
-            # 检查是否是gzip压缩数据（gzip魔数：1f 8b）
+                return b""
+
+            # 按魔数兜底：gzip为1f 8b，zlib流以78开头
             if content[:2] == b'\x1f\x8b':
                 try:
-                    decompressed = gzip.decompress(content)
-                    return decompressed.decode('utf-8')
+                    return gzip.decompress(content)
                 except Exception as e:
-                    self.logger.debug(f"gzip解压失败: {e}")
-            
-            # 检查是否是zlib/deflate压缩数据
-            try:
-                decompressed = zlib.decompress(content)
-                return decompressed.decode('utf-8')
-            except Exception as e:
-                self.logger.debug(f"zlib解压失败: {e}")
-            
-            # 尝试直接解码
-            if isinstance(content, bytes):
-                return content.decode('utf-8', errors='ignore')
-            else:
-                return str(content)
-            
+                    self.logger.debug("gzip解压失败: %s", e)
+            elif content[:1] == b'\x78':
+                try:
+                    return zlib.decompress(content)
+                except Exception as e:
+                    self.logger.debug("zlib解压失败: %s", e)
+
+            return content
+
         except Exception as e:
-            self.logger.error(f"解压响应内容失败: {e}")
-            # 返回原始text（如果有）
-            if hasattr(response, 'text'):
-                return response.text
-            return ""
+            self.logger.error(f"读取响应内容失败: {e}")
+            return b""
     
+    def _response_json(self, response) -> Optional[dict]:
+        """取出响应的JSON数据
+
+        缓存命中（CachedResponse）直接返回已解析的dict，
+        不再经过text序列化+json.loads的往返。
+        """
+        if isinstance(response, CachedResponse):
+            try:
+                return response.json()
+            except json.JSONDecodeError:
+                return None
+
+        response_text = self.decompress_response(response)
+        if not response_text:
+            return None
+
+        try:
+            return orjson.loads(response_text)
+        except orjson.JSONDecodeError as e:
+            self.logger.error(f"JSON解析失败: {e}")
+            self.logger.error(f"响应内容长度: {len(response_text)}, 前100字符: {response_text[:100]}")
+            return None
+
     def get_video_comments(self, bvid: str) -> List[Comment]:
-        """获取视频评论（遍历所有页）"""
-        url = "https://api.bilibili.com/x/v2/reply"
-        aid = self.bvid_to_aid(bvid)
-        
+        """获取视频评论（并发分页，复用异步抓取管线）"""
+        return asyncio.run(self.async_fetch_all_comments([bvid])).get(bvid, [])
+    
+    async def _async_request_json(self, session: 'aiohttp.ClientSession',
+                                  semaphore: asyncio.Semaphore,
+                                  url: str, params: dict) -> Optional[dict]:
+        """异步GET请求并解析JSON（受信号量与令牌桶双重限流）"""
+        async with semaphore:
+            await self._async_rate_limit()
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status != 200:
+                        self.logger.warning(f"异步请求返回状态码 {response.status}: {url}")
+                        return None
+                    return await response.json(content_type=None)
+            except Exception as e:
+                self.logger.error(f"异步请求异常: {e} ({url})")
+                return None
+
+    async def _async_request_bytes(self, session: 'aiohttp.ClientSession',
+                                   semaphore: asyncio.Semaphore,
+                                   url: str, params: dict) -> Optional[bytes]:
+        """异步GET请求并返回原始字节（交给msgspec做定制解码）"""
+        async with semaphore:
+            await self._async_rate_limit()
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status != 200:
+                        self.logger.warning(f"异步请求返回状态码 {response.status}: {url}")
+                        return None
+                    return await response.read()
+            except Exception as e:
+                self.logger.error(f"异步请求异常: {e} ({url})")
+                return None
+
+    async def _async_bvid_to_aid(self, session: 'aiohttp.ClientSession',
+                                 semaphore: asyncio.Semaphore, bvid: str) -> str:
+        """异步将BV号转换为AV号（带持久化缓存）"""
+        cached_aid = self.bvid_aid_cache.get(bvid)
+        if cached_aid:
+            return cached_aid
+
+        # 标准BV号直接本地换算，省一次HTTPS往返
+        if len(bvid) == 12 and bvid.startswith('BV'):
+            try:
+                return str(bv2av(bvid))
+            except KeyError:
+                self.logger.warning(f"BV号 {bvid} 本地换算失败，回退到接口查询")
+
+        url = "https://api.bilibili.com/x/web-interface/view"
+        data = await self._async_request_json(session, semaphore, url, {'bvid': bvid})
+        if data and data.get('code') == 0:
+            aid = data.get('data', {}).get('aid')
+            if aid:
+                self.bvid_aid_cache[bvid] = str(aid)
+                self.save_bvid_aid_cache()
+                return str(aid)
+        self.logger.error(f"BV号 {bvid} 异步转换失败")
+        return ""
+
+    async def _async_get_video_comments(self, session: 'aiohttp.ClientSession',
+                                        semaphore: asyncio.Semaphore, bvid: str) -> List[Comment]:
+        """异步获取单个视频的评论（所有分页并发请求）"""
+        aid = await self._async_bvid_to_aid(session, semaphore, bvid)
         if not aid:
             self.logger.error(f"视频 {bvid} 无法获取aid，跳过获取评论")
             return []
-        
-        all_comments = []
-        pn = 1
-        max_pn = 50  # 最大页数限制，防止无限循环
-        page_size = 20  # 每页评论数（B站API限制，建议使用较小的值）
-        
-        while pn <= max_pn:
-            params = {
+
+        url = "https://api.bilibili.com/x/v2/reply"
+        max_pn = 50  # 最大页数限制
+        page_size = 20
+
+        def page_params(pn: int) -> dict:
+            return {
                 'type': 1,
                 'oid': aid,
                 'pn': pn,
                 'ps': page_size,
                 'sort': 2  # 按时间排序
             }
-            
+
+        # 每页用msgspec按schema定制解码并立即投影成Comment（按rpid去重），
+        # 未声明的字段在C层直接跳过，不会物化成Python对象
+        comments_by_rpid: Dict[int, Comment] = {}
+
+        def decode_page(raw: Optional[bytes]) -> Optional[_ReplyResp]:
+            if not raw:
+                return None
             try:
-                response = self.make_request_with_retry('GET', url, params=params)
-                if not response:
-                    self.logger.warning(f"视频 {bvid} 第{pn}页请求失败，停止获取")
-                    break
-                
-                # 解压响应内容
-                response_text = self.decompress_response(response)
-                
-                if not response_text:
-                    self.logger.error(f"视频 {bvid} 第{pn}页响应内容为空，停止获取")
-                    break
-                
-                # 记录响应内容的前200个字符用于调试
-                self.logger.debug(f"视频 {bvid} 第{pn}页响应内容预览: {response_text[:200]}")
-                
-                # 尝试解析JSON
-                try:
-                    data = json.loads(response_text)
-                except json.JSONDecodeError as e:
-                    self.logger.error(f"视频 {bvid} 第{pn}页JSON解析失败: {e}")
-                    self.logger.error(f"响应内容长度: {len(response_text)}, 前100字符: {response_text[:100]}")
-                    break
-                
-                if data.get('code') == 0:
-                    replies = data.get('data', {}).get('replies', [])
-                    
-                    if not replies:
-                        # 没有更多评论了
-                        self.logger.info(f"视频 {bvid} 第{pn}页无评论，停止获取")
-                        break
-                    
-                    # 解析当前页的评论
-                    for reply in replies:
-                        comment = Comment(
-                            comment_id=str(reply['rpid']),
-                            content=reply['content']['message'],
-                            user=reply['member']['uname'],
-                            uid=str(reply['member']['mid']),
-                            time=reply['ctime']
-                        )
-                        all_comments.append(comment)
-                    
-                    self.logger.info(f"视频 {bvid} 第{pn}页获取到 {len(replies)} 条评论，累计 {len(all_comments)} 条")
-                    
-                    # 检查是否还有更多页面
-                    page_info = data.get('data', {}).get('page', {})
-                    count = page_info.get('count', 0)  # 总评论数
-                    size = page_info.get('size', page_size)  # 每页大小
-                    
-                    # 如果当前页的评论数小于页面大小，说明没有更多评论了
-                    if len(replies) < size:
-                        self.logger.info(f"视频 {bvid} 已获取所有评论，共 {len(all_comments)} 条")
-                        break
-                    
-                    pn += 1
-                else:
-                    error_msg = data.get('message', '')
-                    # 检查是否是ps参数超限错误
-                    if 'ps out of bounds' in error_msg or '参数错误' in error_msg:
-                        self.logger.warning(f"视频 {bvid} page_size={page_size} 超出限制，尝试使用更小的值")
-                        # 如果第一页就失败且page_size > 10，尝试更小的值
-                        if pn == 1 and page_size > 10:
-                            page_size = max(10, page_size // 2)
-                            self.logger.info(f"视频 {bvid} 调整 page_size 为 {page_size}，重试")
-                            continue  # 使用新的page_size重试
-                        else:
-                            self.logger.error(f"视频 {bvid} 第{pn}页获取评论失败: {error_msg}")
-                            break
-                    else:
-                        self.logger.error(f"视频 {bvid} 第{pn}页获取评论失败: {error_msg}")
-                        break
-            except Exception as e:
-                self.logger.error(f"视频 {bvid} 第{pn}页获取评论异常: {e}")
-                break
-        
-        if all_comments:
-            self.logger.info(f"视频 {bvid} 总共获取到 {len(all_comments)} 条评论")
-        else:
-            self.logger.info(f"视频 {bvid} 暂无评论")
-        
+                return _REPLY_DECODER.decode(raw)
+            except msgspec.DecodeError as e:
+                self.logger.error(f"视频 {bvid} 评论响应解码失败: {e}")
+                return None
+
+        def collect_page(resp: _ReplyResp) -> int:
+            replies = resp.data.replies if resp.data and resp.data.replies else []
+            for reply in replies:
+                rpid = reply.rpid
+                if rpid in comments_by_rpid or not reply.content or not reply.member:
+                    continue
+                comments_by_rpid[rpid] = Comment(
+                    comment_id=rpid,
+                    content=reply.content.message,
+                    user=reply.member.uname,
+                    uid=reply.member.mid,
+                    time=reply.ctime
+                )
+            return len(replies)
+
+        # 先取第一页拿到总评论数，再并发请求剩余所有页
+        first = decode_page(await self._async_request_bytes(
+            session, semaphore, url, page_params(1)))
+        if not first:
+            self.logger.warning(f"视频 {bvid} 第1页请求失败，跳过")
+            return []
+        if first.code != 0:
+            self.logger.error(f"视频 {bvid} 获取评论失败: {first.message}")
+            return []
+
+        first_count = collect_page(first)
+        page = first.data.page if first.data else None
+        count = page.count if page and page.count else first_count
+        size = (page.size if page else 0) or page_size
+        num_pages = min(max_pn, math.ceil(count / size)) if count else 1
+        del first  # 尽早释放第一页的原始回复树
+
+        if num_pages > 1:
+            pages = await asyncio.gather(*(
+                self._async_request_bytes(session, semaphore, url, page_params(pn))
+                for pn in range(2, num_pages + 1)
+            ))
+            for raw in pages:
+                resp = decode_page(raw)
+                if resp and resp.code == 0:
+                    collect_page(resp)
+
+        all_comments = list(comments_by_rpid.values())
+
+        self.logger.info(f"视频 {bvid} 获取到 {len(all_comments)} 条评论")
         return all_comments
-    
+
+    async def async_fetch_all_comments(self, bvids: List[str]) -> Dict[str, List[Comment]]:
+        """并发获取多个视频的评论
+
+        使用asyncio.gather并发请求所有视频，信号量限制并发数为3，
+        避免触发B站约6次/秒的频率限制。
+        """
+        semaphore = asyncio.Semaphore(3)
+        # zstd/br是按httpx的解码能力协商的；aiohttp自己能解什么
+        # 就让它自己谈，否则响应会原样透传导致解码失败
+        headers = {k: v for k, v in self.session.headers.items()
+                   if k.lower() != 'accept-encoding'}
+        cookies = dict(self.session.cookies)
+
+        connector = aiohttp.TCPConnector(limit=32, keepalive_timeout=30)
+        async with aiohttp.ClientSession(headers=headers, cookies=cookies,
+                                         connector=connector) as session:
+            results = await asyncio.gather(*(
+                self._async_get_video_comments(session, semaphore, bvid)
+                for bvid in bvids
+            ))
+
+        return dict(zip(bvids, results))
+
     def bvid_to_aid(self, bvid: str) -> str:
-        """将BV号转换为AV号"""
+        """将BV号转换为AV号（带持久化缓存）"""
+        cached_aid = self.bvid_aid_cache.get(bvid)
+        if cached_aid:
+            return cached_aid
+
+        # 标准BV号直接本地换算，省一次HTTPS往返
+        if len(bvid) == 12 and bvid.startswith('BV'):
+            try:
+                return str(bv2av(bvid))
+            except KeyError:
+                self.logger.warning(f"BV号 {bvid} 本地换算失败，回退到接口查询")
+
         url = "https://api.bilibili.com/x/web-interface/view"
         params = {'bvid': bvid}
-        
+
         try:
-            response = self.make_request_with_retry('GET', url, params=params)
+            response = self.make_request_with_retry('GET', url, params=params,
+                                                    headers=_IDENTITY_HEADERS)
             if not response:
                 self.logger.error(f"BV号 {bvid} 转换失败，无响应")
                 return ""
             
-            # 解压响应内容
-            response_text = self.decompress_response(response)
-            
-            if not response_text:
-                self.logger.error(f"BV号 {bvid} 转换失败，响应内容为空")
-                return ""
-            
-            # 尝试解析JSON
-            try:
-                data = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                self.logger.error(f"BV号 {bvid} JSON解析失败: {e}")
-                self.logger.error(f"响应内容长度: {len(response_text)}, 前100字符: {response_text[:100]}")
+            data = self._response_json(response)
+            if data is None:
+                self.logger.error(f"BV号 {bvid} 转换失败，响应为空或解析失败")
                 return ""
-            
+
             if data.get('code') == 0:
                 aid = data.get('data', {}).get('aid')
                 if aid:
+                    self.bvid_aid_cache[bvid] = str(aid)
+                    self.save_bvid_aid_cache()
                     return str(aid)
                 else:
                     self.logger.error(f"BV号 {bvid} 转换失败，未找到aid")
@@ -1024,85 +1433,171 @@ class BiliCommentBot:
     
     def generate_reply(self, comment: str) -> Optional[str]:
         """使用DeepSeek API生成回复"""
-        api_config = self.config['deepseek']
+        # 灌水评论本地过滤，重复评论复用缓存，都不消耗LLM调用
+        if _is_trivial_comment(comment):
+            self.logger.info(f"评论无实际内容，跳过回复生成: {comment!r}")
+            return None
+        cached_reply = self._reply_cache.get(comment)
+        if cached_reply is not None:
+            return cached_reply
 
-        headers = {
-            'Authorization': f"Bearer {api_config['api_key']}",
-            'Content-Type': 'application/json'
+        data = {
+            **self._deepseek_payload_base,
+            'messages': [
+                {'role': 'system', 'content': self._deepseek_system_prompt},
+                {'role': 'user', 'content': comment}
+            ]
         }
 
-        # 从配置文件读取系统提示词
-        system_prompt = api_config.get('system_prompt',
-            '你是一个友善的B站游戏区Minecraft UP主，请对评论做出自然、友好的回复。回复要简洁明了，控制在100字以内。')
+        try:
+            response = self._llm_breaker.call(self._deepseek_post, data)
+            result = response.json()
+            reply = result['choices'][0]['message']['content'].strip()
+            self._reply_cache[comment] = reply
+            self.logger.info(f"DeepSeek生成回复: {reply}")
+            return reply
+        except pybreaker.CircuitBreakerError:
+            self.logger.error("DeepSeek接口熔断中，跳过请求")
+            return None
+        except httpx.HTTPStatusError as e:
+            self.logger.error(f"DeepSeek API调用失败: {e.response.status_code}, {e.response.text}")
+            return None
+        except Exception as e:
+            self.logger.error(f"DeepSeek API调用异常: {e}")
+            return None
+
+    def _deepseek_post(self, data: dict) -> 'httpx.Response':
+        """发送DeepSeek请求；非2xx抛异常，使失败计入熔断统计"""
+        response = self._deepseek_client.post(self._deepseek_url, json=data)
+        response.raise_for_status()
+        return response
+
+    async def _async_generate_reply(self, semaphore: asyncio.Semaphore,
+                                    comment: str) -> Optional[str]:
+        """异步调用DeepSeek API生成单条回复"""
+        # 与同步路径相同的本地过滤与重复评论缓存
+        if _is_trivial_comment(comment):
+            self.logger.info(f"评论无实际内容，跳过回复生成: {comment!r}")
+            return None
+        cached_reply = self._reply_cache.get(comment)
+        if cached_reply is not None:
+            return cached_reply
 
         data = {
-            'model': api_config['model'],
+            **self._deepseek_payload_base,
             'messages': [
-                {'role': 'system', 'content': system_prompt},
+                {'role': 'system', 'content': self._deepseek_system_prompt},
                 {'role': 'user', 'content': comment}
-            ],
-            'max_tokens': api_config['max_tokens'],
-            'temperature': api_config['temperature']
+            ]
         }
 
-        try:
-            response = requests.post(
-                f"{api_config['base_url']}/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=30
-            )
-
-            if response.status_code == 200:
+        async with semaphore:
+            try:
+                # 与同步路径共用_llm_breaker，异步失败同样计入熔断统计。
+                # pybreaker的call_async是Tornado专用接口，在asyncio下不可用，
+                # 因此把熔断器包装的同步请求放到线程池执行；并发由semaphore限制
+                response = await asyncio.to_thread(
+                    self._llm_breaker.call, self._deepseek_post, data)
                 result = response.json()
                 reply = result['choices'][0]['message']['content'].strip()
+                self._reply_cache[comment] = reply
                 self.logger.info(f"DeepSeek生成回复: {reply}")
                 return reply
-            else:
-                self.logger.error(f"DeepSeek API调用失败: {response.status_code}, {response.text}")
+            except pybreaker.CircuitBreakerError:
+                self.logger.error("DeepSeek接口熔断中，跳过请求")
                 return None
-        except Exception as e:
-            self.logger.error(f"DeepSeek API调用异常: {e}")
-            return None
-    
-    def like_comment(self, bvid: str, comment_id: str) -> bool:
-        """给评论点赞"""
-        # 确保使用最新的CSRF token
-        if self.cookie_manager:
-            self.csrf_token = self.cookie_manager._get_csrf_from_cookie()
+            except httpx.HTTPStatusError as e:
+                self.logger.error(f"DeepSeek API调用失败: {e.response.status_code}")
+                return None
+            except Exception as e:
+                self.logger.error(f"DeepSeek API调用异常: {e}")
+                return None
+
+    async def _generate_and_post(self, pending: List[Tuple[str, 'Comment']],
+                                 oid_by_bvid: Dict[str, str],
+                                 like_enabled: bool, prefix: Optional[str],
+                                 reply_delay: float) -> int:
+        """生成与发布的流水线
+
+        DeepSeek单次补全通常需要2-10秒，是串行流程的主要耗时；
+        生成请求放到线程池并发执行（信号量限制并发数为4，复用
+        _deepseek_client的HTTP/2连接），某条回复一旦生成完即可发布，
+        后续评论的生成与发布重叠进行。
+        B站的写操作通过锁保持串行，点赞/回复仍走同步限流通道。
+        """
+        semaphore = asyncio.Semaphore(4)
+        post_lock = asyncio.Lock()
+        processed = 0
+
+        async def handle(bvid: str, comment: Comment):
+            nonlocal processed
+            reply_content = await self._async_generate_reply(
+                semaphore, comment.content)
+            if not reply_content:
+                return
+
+            oid = oid_by_bvid[bvid]
+            if not oid:
+                self.logger.error(f"视频 {bvid} 无法获取aid，跳过回复")
+                return
+
+            async with post_lock:
+                # 同步的点赞/回复放到线程池，阻塞限流不拖慢事件循环
+                if like_enabled:
+                    await asyncio.to_thread(
+                        self.like_comment, oid, comment.comment_id)
+
+                posted = await asyncio.to_thread(
+                    self.reply_comment, oid, comment.comment_id,
+                    reply_content, prefix)
+                if posted:
+                    self.mark_comment_processed(comment.comment_id)
+                    self.save_history(comment, reply_content)
+                    processed += 1
+                    # 延迟避免频繁操作（只阻塞发布通道，不阻塞生成）
+                    if reply_delay > 0:
+                        await asyncio.sleep(reply_delay)
+
+        await asyncio.gather(*(
+            handle(bvid, comment) for bvid, comment in pending
+        ))
+
+        return processed
+
+    def _encoded_csrf(self) -> str:
+        """返回URL编码后的csrf_token，仅在token变化时重新编码"""
+        if self._csrf_quoted_src is not self.csrf_token:
+            self._csrf_quoted = urllib.parse.quote(self.csrf_token or '', safe='')
+            self._csrf_quoted_src = self.csrf_token
+        return self._csrf_quoted
+
+    def like_comment(self, oid: str, comment_id) -> bool:
+        """给评论点赞
 
+        Args:
+            oid: 已解析的视频aid（由调用方通过bvid_to_aid解析一次后传入）
+            comment_id: 评论rpid
+        """
+        # csrf_token只在Cookie实际刷新时更新，这里直接使用缓存值
         if not self.csrf_token:
             self.logger.error("未找到CSRF token，无法点赞评论")
             return False
 
         url = "https://api.bilibili.com/x/v2/reply/action"
 
-        data = {
-            'type': 1,
-            'oid': self.bvid_to_aid(bvid),
-            'rpid': comment_id,
-            'action': 1,  # 1表示点赞，2表示取消点赞
-            'csrf': self.csrf_token
-        }
+        # 表单体预编码：除rpid外都是常量字段（action=1表示点赞）
+        body = (f"type=1&oid={oid}&rpid={comment_id}&action=1"
+                f"&csrf={self._encoded_csrf()}")
 
         try:
-            response = self.make_request_with_retry('POST', url, data=data)
+            response = self.make_request_with_retry('POST', url, content=body,
+                                                    headers=_FORM_HEADERS)
             if not response:
                 return False
 
-            # 解压响应内容
-            response_text = self.decompress_response(response)
-
-            if not response_text:
-                self.logger.error(f"点赞评论失败，响应内容为空")
-                return False
-
-            # 尝试解析JSON
-            try:
-                result = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                self.logger.error(f"点赞评论JSON解析失败: {e}")
-                self.logger.error(f"响应内容长度: {len(response_text)}, 前100字符: {response_text[:100]}")
+            result = self._response_json(response)
+            if result is None:
+                self.logger.error(f"点赞评论失败，响应为空或解析失败")
                 return False
 
             if result.get('code') == 0:
@@ -1115,12 +1610,17 @@ class BiliCommentBot:
             self.logger.error(f"点赞评论异常: {e}")
             return False
     
-    def reply_comment(self, bvid: str, comment_id: str, content: str) -> bool:
-        """回复评论"""
-        # 确保使用最新的CSRF token
-        if self.cookie_manager:
-            self.csrf_token = self.cookie_manager._get_csrf_from_cookie()
+    def reply_comment(self, oid: str, comment_id, content: str,
+                      prefix: Optional[str] = None) -> bool:
+        """回复评论
 
+        Args:
+            oid: 已解析的视频aid（由调用方通过bvid_to_aid解析一次后传入）
+            comment_id: 评论rpid
+            content: 回复内容
+            prefix: 回复前缀，不传时从配置读取
+        """
+        # csrf_token只在Cookie实际刷新时更新，这里直接使用缓存值
         if not self.csrf_token:
             self.logger.error("未找到CSRF token，无法回复评论")
             return False
@@ -1128,36 +1628,24 @@ class BiliCommentBot:
         url = "https://api.bilibili.com/x/v2/reply/add"
 
         # 添加回复前缀
-        prefix = self.config['reply']['prefix']
+        if prefix is None:
+            prefix = self.config['reply']['prefix']
         reply_content = f"{prefix}{content}"
 
-        data = {
-            'type': 1,
-            'oid': self.bvid_to_aid(bvid),
-            'root': comment_id,
-            'parent': comment_id,
-            'message': reply_content,
-            'csrf': self.csrf_token
-        }
+        # 表单体预编码：只有message需要逐次转义
+        body = (f"type=1&oid={oid}&root={comment_id}&parent={comment_id}"
+                f"&message={urllib.parse.quote(reply_content, safe='')}"
+                f"&csrf={self._encoded_csrf()}")
 
         try:
-            response = self.make_request_with_retry('POST', url, data=data)
+            response = self.make_request_with_retry('POST', url, content=body,
+                                                    headers=_FORM_HEADERS)
             if not response:
                 return False
 
-            # 解压响应内容
-            response_text = self.decompress_response(response)
-
-            if not response_text:
-                self.logger.error(f"回复评论失败，响应内容为空")
-                return False
-
-            # 尝试解析JSON
-            try:
-                result = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                self.logger.error(f"回复评论JSON解析失败: {e}")
-                self.logger.error(f"响应内容长度: {len(response_text)}, 前100字符: {response_text[:100]}")
+            result = self._response_json(response)
+            if result is None:
+                self.logger.error(f"回复评论失败，响应为空或解析失败")
                 return False
 
             if result.get('code') == 0:
@@ -1195,15 +1683,12 @@ class BiliCommentBot:
                 new_refresh_token = result_data.get('new_refresh_token')
                 new_cookies = result_data.get('cookies')
 
-                # 更新session的cookie
+                # 更新session的cookie（与cookie_manager共享同一个jar）
                 self.session.cookies.clear()
                 self.session.cookies.update(new_cookies)
 
-                # 同步cookie_manager的cookie到main session
-                self.session.cookies.update(self.cookie_manager.session.cookies)
-
                 # 更新CSRF token
-                self.csrf_token = self.cookie_manager._get_csrf_from_cookie()
+                self.csrf_token = self.cookie_manager.csrf_token
 
                 # 验证刷新后的Cookie是否有效
                 self.logger.info("验证刷新后的Cookie...")
@@ -1231,7 +1716,7 @@ class BiliCommentBot:
                 if 'Cookie已过期' in error_msg:
                     self.logger.error("Cookie已过期，需要重新登录获取refresh_token")
         else:
-            self.logger.debug(f"Cookie状态正常: {result.get('message')}")
+            self.logger.debug("Cookie状态正常: %s", result.get('message'))
             self.last_cookie_refresh_time = current_time
 
         return False
@@ -1251,7 +1736,9 @@ class BiliCommentBot:
         if self.auto_refresh_cookie:
             self.refresh_cookie_if_needed()
 
-        if not self.config['reply']['enabled']:
+        # 配置项提前取成局部变量，避免内层循环反复做字典链式查找
+        reply_config = self.config['reply']
+        if not reply_config['enabled']:
             self.logger.info("自动回复已禁用")
             return
 
@@ -1259,48 +1746,64 @@ class BiliCommentBot:
         if not videos:
             return
 
-        max_process = self.config['reply']['max_process']
+        max_process = reply_config['max_process']
+        only_new = reply_config['only_new']
+        reply_delay = reply_config['reply_delay']
+        like_enabled = reply_config.get('like_enabled', False)
+        prefix = reply_config['prefix']
         processed_count = 0
 
-        for video in videos:
-            if processed_count >= max_process:
-                break
+        # 并发获取所有视频的评论，减少串行等待
+        bvids = [video['bvid'] for video in videos]
+        comments_by_bvid = asyncio.run(self.async_fetch_all_comments(bvids))
 
-            bvid = video['bvid']
-            comments = self.get_video_comments(bvid)
+        # 收集待处理的新评论
+        pending: List[Tuple[str, Comment]] = []
+        for bvid in bvids:
+            if len(pending) >= max_process:
+                break
 
-            for comment in comments:
-                if processed_count >= max_process:
+            for comment in comments_by_bvid.get(bvid, []):
+                if len(pending) >= max_process:
                     break
 
                 # 检查是否已处理过
-                if comment.comment_id in self.processed_comments:
+                if self.is_comment_processed(comment.comment_id):
+                    continue
+
+                # 灌水评论在入选阶段就标记为已处理：
+                # 不占用max_process名额，也不会每轮重新入队
+                if _is_trivial_comment(comment.content):
+                    self.mark_comment_processed(comment.comment_id)
                     continue
 
                 # 检查是否只处理新评论
-                if self.config['reply']['only_new']:
+                if only_new:
                     # 这里可以添加更复杂的新评论判断逻辑
                     # 比如检查评论时间等
                     pass
 
-                # 生成回复
-                reply_content = self.generate_reply(comment.content)
-                if reply_content:
-                    # 如果启用了点赞功能，先点赞评论
-                    if self.config['reply'].get('like_enabled', False):
-                        self.like_comment(bvid, comment.comment_id)
-
-                    # 发送回复
-                    if self.reply_comment(bvid, comment.comment_id, reply_content):
-                        self.processed_comments.add(comment.comment_id)
-                        # 保存到历史记录
-                        self.save_history(comment, reply_content)
-                        processed_count += 1
-
-                        # 延迟避免频繁操作
-                        delay = self.config['reply']['reply_delay']
-                        if delay > 0:
-                            time.sleep(delay)
+                pending.append((bvid, comment))
+
+        if not pending:
+            return
+
+        # DeepSeek熔断开启时跳过本轮，等下个check_interval再试
+        if self._llm_breaker.current_state == 'open':
+            self.logger.warning("DeepSeek接口熔断中，本轮跳过回复生成")
+            return
+
+        # 每个bvid的aid在循环外解析一次，流水线内只查本地dict
+        oid_by_bvid = {
+            bvid: self.bvid_to_aid(bvid)
+            for bvid in {b for b, _ in pending}
+        }
+
+        # 生成与发布流水线化：第N条的发布与第N+1条的生成重叠进行
+        processed_count = asyncio.run(self._generate_and_post(
+            pending, oid_by_bvid, like_enabled, prefix, reply_delay))
+        if processed_count:
+            self.logger.info(f"本轮处理了 {processed_count} 条评论")
     
     def run(self):
         """运行机器人"""
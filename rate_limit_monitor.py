@@ -8,24 +8,68 @@
 import time
 import json
 import logging
+from array import array
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
-from collections import defaultdict, deque
+from collections import defaultdict
+
+
+class _FloatRing:
+    """定容浮点环形缓冲区
+
+    元素按追加顺序（即时间升序）存放在非装箱的C double数组里，
+    满时覆盖最旧元素。相比deque[float]省去每元素的PyFloat对象开销。
+    """
+    __slots__ = ('_buf', '_cap', '_head', '_n')
+
+    def __init__(self, capacity: int):
+        self._buf = array('d', bytes(8 * capacity))
+        self._cap = capacity
+        self._head = 0
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    def append(self, value: float):
+        """追加元素；缓冲区满时返回被覆盖的最旧元素，否则返回None"""
+        idx = (self._head + self._n) % self._cap
+        evicted = None
+        if self._n < self._cap:
+            self._n += 1
+        else:
+            evicted = self._buf[idx]
+            self._head = (self._head + 1) % self._cap
+        self._buf[idx] = value
+        return evicted
+
+    def popleft(self) -> float:
+        value = self._buf[self._head]
+        self._head = (self._head + 1) % self._cap
+        self._n -= 1
+        return value
+
+    def peekleft(self) -> float:
+        return self._buf[self._head]
+
 
 class RateLimitMonitor:
     """频率限制监控器"""
-    
-    def __init__(self, window_size: int = 300):
+
+    def __init__(self, window_size: int = 300, capacity: int = 4096):
         """
         初始化监控器
-        
+
         Args:
             window_size: 监控窗口大小（秒），默认5分钟
+            capacity: 窗口内最多保留的请求记录数，超出时覆盖最旧
         """
         self.window_size = window_size
-        self.requests = deque()  # 存储请求时间戳
-        self.failures = deque()   # 存储失败时间戳
-        self.response_times = deque()  # 存储响应时间
+        self.requests = _FloatRing(capacity)  # 存储请求时间戳
+        self.failures = _FloatRing(capacity)   # 存储失败时间戳
+        self.response_times = _FloatRing(capacity)  # 存储响应时间
+        self._rt_sum = 0.0  # 窗口内响应时间的滑动和
+        self._dirty = 0  # 距上次清理的新增记录数，攒批清理
         self.status_codes = defaultdict(int)  # 状态码统计
         
         # 统计数据
@@ -46,9 +90,12 @@ class RateLimitMonitor:
         """
         current_time = time.time()
         
-        # 记录请求
+        # 记录请求，同时维护响应时间的滑动和
         self.requests.append(current_time)
-        self.response_times.append(response_time)
+        evicted_rt = self.response_times.append(response_time)
+        self._rt_sum += response_time
+        if evicted_rt is not None:
+            self._rt_sum -= evicted_rt
         self.status_codes[status_code] += 1
         self.total_requests += 1
         
@@ -59,39 +106,48 @@ class RateLimitMonitor:
             if status_code == 429:
                 self.total_429 += 1
         
-        # 清理过期数据
-        self._cleanup_old_data(current_time)
+        # 攒批清理：突发记录时不必每条都扫一遍过期数据
+        self._dirty += 1
+        if self._dirty >= 32:
+            self._cleanup_old_data(current_time)
     
     def _cleanup_old_data(self, current_time: float):
         """清理过期数据"""
         cutoff_time = current_time - self.window_size
-        
-        while self.requests and self.requests[0] < cutoff_time:
+
+        # requests与response_times逐条对应，同步弹出保持对齐
+        while len(self.requests) and self.requests.peekleft() < cutoff_time:
             self.requests.popleft()
-        
-        while self.failures and self.failures[0] < cutoff_time:
+            self._rt_sum -= self.response_times.popleft()
+
+        while len(self.failures) and self.failures.peekleft() < cutoff_time:
             self.failures.popleft()
-        
-        while self.response_times and len(self.response_times) > len(self.requests):
-            self.response_times.popleft()
+
+        self._dirty = 0
     
     def get_current_rate(self) -> float:
         """获取当前请求频率（请求/秒）"""
-        if not self.requests:
+        if self._dirty:
+            self._cleanup_old_data(time.time())
+        if not len(self.requests):
             return 0.0
         return len(self.requests) / self.window_size
-    
+
     def get_failure_rate(self) -> float:
         """获取当前失败率"""
-        if not self.requests:
+        if self._dirty:
+            self._cleanup_old_data(time.time())
+        if not len(self.requests):
             return 0.0
-        return len(self.failures) / len(self.requests) if self.requests else 0.0
-    
+        return len(self.failures) / len(self.requests)
+
     def get_avg_response_time(self) -> float:
-        """获取平均响应时间"""
-        if not self.response_times:
+        """获取平均响应时间（滑动和，O(1)）"""
+        if self._dirty:
+            self._cleanup_old_data(time.time())
+        if not len(self.response_times):
             return 0.0
-        return sum(self.response_times) / len(self.response_times)
+        return self._rt_sum / len(self.response_times)
     
     def get_recommendations(self) -> List[str]:
         """获取优化建议"""